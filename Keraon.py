@@ -40,28 +40,20 @@ def ctdpheno(ref_df, df):
     subtypes = ref_df['Subtype'].unique().tolist()
     subtypes.remove('Healthy')
 
-    # Initialize DataFrame for storing predictions
-    cols = subtypes + ['TFX', 'TFX_shifted', 'Prediction']
-    predictions = pd.DataFrame(index=df.index, columns=cols)
-
-    # Set the correct data types for the columns
-    predictions[subtypes] = predictions[subtypes].astype(float)
-    predictions[['TFX', 'TFX_shifted']] = predictions[['TFX', 'TFX_shifted']].astype(float)
-    predictions['Prediction'] = predictions['Prediction'].astype(str)
+    # Calculate mean and covariance for 'Healthy' subtype (sample-independent, so computed once)
+    healthy_data = ref_df[ref_df['Subtype'] == 'Healthy'].iloc[:, 1:]
+    mu_healthy = healthy_data.mean().to_numpy()
+    cov_healthy = np.cov(healthy_data.to_numpy(), rowvar=False)
+    # Calculate means for other subtypes
+    mu_subs = [ref_df[ref_df['Subtype'] == subtype].iloc[:, 1:].mean().to_numpy() for subtype in subtypes]
 
     # Calculate RLLs for each sample
+    tfxs, tfxs_shifted, all_log_likelihoods = [], [], []
     for i, sample in enumerate(samples, start=1):
         print(f'\rRunning samples | completed: [{i}/{len(samples)}]', end='')
 
         tfx = df.loc[sample, 'TFX']
         feature_vals = df.loc[sample].drop('TFX').to_numpy()
-        # Calculate mean and covariance for 'Healthy' subtype
-        healthy_data = ref_df[ref_df['Subtype'] == 'Healthy'].iloc[:, 1:]
-        mu_healthy = healthy_data.mean().to_numpy()
-        cov_healthy = np.cov(healthy_data.to_numpy(), rowvar=False)
-        # Calculate means for other subtypes
-        mu_subs = [ref_df[ref_df['Subtype'] == subtype].iloc[:, 1:].mean().to_numpy() for subtype in subtypes]
-        # Calculate RLLs
         log_likelihoods = calculate_log_likelihoods(tfx, feature_vals, mu_healthy, cov_healthy, mu_subs, subtypes)
 
         # If all log likelihoods are -inf, optimize 'TFX' to maximize total log likelihood
@@ -71,8 +63,12 @@ def ctdpheno(ref_df, df):
         else:
             tfx_shifted = tfx
 
-        # Calculate weights and update predictions DataFrame
-        update_predictions(predictions, sample, tfx, tfx_shifted, log_likelihoods, subtypes)
+        tfxs.append(tfx)
+        tfxs_shifted.append(tfx_shifted)
+        all_log_likelihoods.append(log_likelihoods)
+
+    # Calculate weights and construct the predictions DataFrame for all samples at once
+    predictions = build_predictions(df.index, tfxs, tfxs_shifted, all_log_likelihoods, subtypes)
 
     print('\nFinished.')
     return predictions
@@ -136,14 +132,18 @@ def keraon(ref_df, df):
     basis_vectors = [mean_vectors[i] - mean_vectors[hd_idx] for i in range(len(subtypes)) if i != hd_idx]
     basis = gram_schmidt(basis_vectors)  # unit vectors in the direction of each subtype
 
-    # Process each sample
+    # Project every sample into the subtype basis with one batched transform
     samples = list(df.index)
+    raw_vectors = df[features].to_numpy(dtype=float)
+    hd_samples = raw_vectors - mean_vectors[hd_idx]  # directional vectors from HD to samples
+    sample_vectors, orthogonal_vectors = transform_to_basis(hd_samples, basis)
+
+    # Process each sample
     n_complete, n_samples = 0, len(samples)
-    for sample in samples:
+    for sample_idx, sample in enumerate(samples):
         tfx = df.loc[sample, 'TFX']
-        raw_vector = np.asarray(df.loc[sample, features].to_numpy(), dtype=float)
-        hd_sample = raw_vector - mean_vectors[hd_idx]  # directional vector from HD to sample
-        sample_vector, orthogonal_vector = transform_to_basis(hd_sample, basis)
+        sample_vector = sample_vectors[sample_idx]
+        orthogonal_vector = orthogonal_vectors[sample_idx]
 
         # Determine FS region and adjust sample vector if necessary
         if all(sample_vector > 0):
@@ -2,93 +2,134 @@
 # Robert Patton, rpatton@fredhutch.org
 # v2.2, 5/2/2024
 
+import math
 import itertools
 import numpy as np
 import pandas as pd
 from sklearn import metrics
 from scipy.stats import shapiro
 from scipy.special import logsumexp, softmax
-from scipy.stats import multivariate_normal
-from scipy.spatial.distance import pdist
 
 from multiprocessing import Pool
 
+try:
+    from numba import njit
+except ImportError:  # numba is an optional accelerator; without it the kernels run as plain Python
+    def njit(*args, **kwargs):
+        if args and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+LOG_2PI = np.log(2 * np.pi)
+
 
 def is_positive_semi_definite(matrix):
+    # A Cholesky attempt (LAPACK potrf) is ~2x cheaper than a full eigendecomposition
+    # and short-circuits on failure; the jitter tolerates exactly-singular PSD matrices
     try:
-        eigenvalues = np.linalg.eigvalsh(matrix)
-        return np.all(eigenvalues >= 0)
+        np.linalg.cholesky(matrix + 1e-12 * np.eye(len(matrix)))
+        return True
     except np.linalg.LinAlgError:
         return False
 
+def _iso_logpdf(x, mu):
+    """
+    Multivariate normal log-pdf with identity covariance, computed in closed form.
+    """
+    diff = x - mu
+    return -0.5 * (mu.size * LOG_2PI + np.dot(diff, diff))
+
 def calculate_log_likelihoods(tfx, feature_vals, mu_healthy, cov_healthy, mu_subs, subtypes):
     """
     Calculate log likelihoods for given TFX value and feature values.
     """
     log_likelihoods = []
-    for subtype in subtypes:
-        mu_mixture = tfx * mu_subs[subtypes.index(subtype)] + (1 - tfx) * mu_healthy
-        cov_mixture = np.eye(cov_healthy.shape[0])
-        log_likelihood = multivariate_normal.logpdf(feature_vals, mean=mu_mixture, cov=cov_mixture)
+    for i, _ in enumerate(subtypes):
+        mu_mixture = tfx * mu_subs[i] + (1 - tfx) * mu_healthy
+        log_likelihood = _iso_logpdf(feature_vals, mu_mixture)
         log_likelihoods.append(log_likelihood)
     return log_likelihoods
 
-def optimize_tfx(feature_vals, mu_healthy, cov_healthy, mu_subs, subtypes):
+def batch_optimize_tfx(features, mu_healthy, mu_subs):
     """
-    Optimize 'TFX' to maximize total log likelihood.
-    """
-    best_tfx = 0
-    best_ll = float('inf')
+    Optimize 'TFX' to maximize total log likelihood for a whole batch of samples at once.
 
-    for try_tfx in np.arange(0, 1.001, 0.001):
-        log_likelihoods = calculate_log_likelihoods(try_tfx, feature_vals, mu_healthy, cov_healthy, mu_subs, subtypes)
-        ll = -np.sum(np.exp(log_likelihoods))
-        if ll < best_ll:
-            best_ll = ll
-            best_tfx = try_tfx
+    Parameters:
+    features (np.array): (n_samples, n_features) feature matrix.
+    mu_healthy (np.array): Mean vector of the 'Healthy' subtype.
+    mu_subs (list of np.array): Mean vectors of the other subtypes.
 
-    return best_tfx
+    Returns:
+    np.array: The best TFX value on the grid for each sample.
+    """
+    features = np.atleast_2d(np.asarray(features, dtype=float))
+    mu_subs_arr = np.asarray(mu_subs)  # (n_subtypes, n_features)
+    tfx_grid = np.arange(0, 1.001, 0.001)
+    # Mixture means for every (TFX, subtype) pair at once: (n_tfx, n_subtypes, n_features)
+    mu_mixtures = tfx_grid[:, None, None] * mu_subs_arr[None, :, :] + (1 - tfx_grid[:, None, None]) * mu_healthy
+    n_tfx, n_subtypes, n_features = mu_mixtures.shape
+    flat_mu = mu_mixtures.reshape(n_tfx * n_subtypes, n_features)
+    # ||x - mu||^2 expanded so the cross term is a single GEMM over all samples,
+    # avoiding a full (n_samples, n_tfx, n_subtypes, n_features) difference tensor
+    sq_dists = ((features ** 2).sum(axis=1)[:, None]
+                - 2.0 * features @ flat_mu.T
+                + (flat_mu ** 2).sum(axis=1)[None, :])
+    # Identity-covariance log-pdf, evaluated in closed form over the whole grid
+    log_likelihoods = -0.5 * (n_features * LOG_2PI + sq_dists.reshape(features.shape[0], n_tfx, n_subtypes))
+    # Score in log space: logsumexp is monotone in the summed likelihood, so the argmin
+    # is unchanged, but it cannot underflow to a flat all-zero objective
+    objective = -logsumexp(log_likelihoods, axis=2)
+    return tfx_grid[np.argmin(objective, axis=1)]
 
-def update_predictions(predictions, sample, tfx, tfx_shifted, log_likelihoods, subtypes):
+def optimize_tfx(feature_vals, mu_healthy, cov_healthy, mu_subs, subtypes):
     """
-    Update predictions DataFrame with calculated values.
+    Optimize 'TFX' to maximize total log likelihood for a single sample.
     """
-    weights = softmax(log_likelihoods)
+    return batch_optimize_tfx(feature_vals, mu_healthy, mu_subs)[0]
 
-    predictions.loc[sample, 'TFX'] = tfx
-    predictions.loc[sample, 'TFX_shifted'] = tfx_shifted
-    max_weight = 0
-    max_subtype = 'NoSolution'
-    for subtype in subtypes:
-        weight = np.round(weights[subtypes.index(subtype)], 4)
-        predictions.loc[sample, subtype] = weight
-        if weight > max_weight:
-            max_weight = weight
-            max_subtype = subtype
+def build_predictions(samples, tfxs, tfxs_shifted, log_likelihoods, subtypes):
+    """
+    Construct the predictions DataFrame from accumulated per-sample values, computing
+    every softmax at once. All values stay in typed NumPy arrays until the DataFrame
+    is materialized here, so scoring never goes through per-sample pandas indexing.
+    """
+    log_likelihoods = np.asarray(log_likelihoods, dtype=float)
+    weights = softmax(log_likelihoods, axis=1)
+    pred_labels = np.take(subtypes, np.argmax(weights, axis=1))
+    pred_labels = np.where(np.all(np.isfinite(weights), axis=1), pred_labels, 'NoSolution')
 
-    predictions.loc[sample, 'Prediction'] = max_subtype
+    predictions = pd.DataFrame(np.round(weights, 4), index=samples, columns=subtypes)
+    predictions['TFX'] = np.asarray(tfxs, dtype=float)
+    predictions['TFX_shifted'] = np.asarray(tfxs_shifted, dtype=float)
+    predictions['Prediction'] = pred_labels
+    return predictions
 
 def gram_schmidt(vectors):
     """
     Perform the Gram-Schmidt process to orthogonalize a set of vectors.
+    Each vector's projections onto the basis built so far are removed with a single
+    matrix product rather than a Python-level sum, preserving the orientation of the
+    input vectors (unlike a plain QR factorization, which may flip signs).
     """
-    basis = []
-    for v in vectors:
-        w = v - sum(np.dot(v,b)*b for b in basis)
-        basis.append(w/np.linalg.norm(w))
-    return np.array(basis)
-
-def transform_to_basis(vector, basis):
+    vectors = np.asarray(vectors, dtype=float)
+    basis = np.empty_like(vectors)
+    for i, v in enumerate(vectors):
+        if i:
+            v = v - basis[:i].T @ (basis[:i] @ v)
+        basis[i] = v / np.linalg.norm(v)
+    return basis
+
+def transform_to_basis(vectors, basis):
     """
-    Project a vector onto a new basis and calculate the difference between the original vector and its projection.
+    Project vectors onto a new basis and calculate the difference between each original
+    vector and its projection. Accepts a single (n_features,) vector or a batch of shape
+    (n_samples, n_features); the two matrix products amortize across the whole batch.
     """
-    # Project the original vector onto the new basis
-    projected_vector = np.dot(vector, basis.T)
-    # Project the transformed vector back into the original space
-    back_projected_vector = np.dot(projected_vector, basis)
-    # Calculate the difference between the original vector and its projection
-    difference_vector = vector - back_projected_vector
-    return projected_vector, difference_vector
+    # Project the original vectors onto the new basis
+    projected_vectors = vectors @ basis.T
+    # Subtract the back-projection directly, without keeping the intermediate
+    difference_vectors = vectors - projected_vectors @ basis
+    return projected_vectors, difference_vectors
 
 
 def minmax_standardize(df: pd.DataFrame, min_dict: dict = None, range_dict: dict = None) -> tuple:
@@ -98,22 +139,127 @@ def minmax_standardize(df: pd.DataFrame, min_dict: dict = None, range_dict: dict
     # If no min/range dictionaries are supplied, calculate them
     print('Standardizing features by min/max . . .')
     if min_dict is None or range_dict is None:
-        min_dict, range_dict = {}, {}
-        for column in df.columns:
-            if column == 'Subtype':
-                continue
-            min_dict[column] = np.nanmin(df[column].values)
-            range_dict[column] = np.nanmax(df[column].values) - min_dict[column]
-
-    # Standardize the features in the dataframe
-    for column in df.columns:
-        if column != 'Subtype' and column in min_dict:
-            df.loc[:, column] -= min_dict[column]
-            df.loc[:, column] /= range_dict[column]
+        feature_cols = [column for column in df.columns if column != 'Subtype']
+        values = df[feature_cols].to_numpy()
+        mins = np.nanmin(values, axis=0)
+        ranges = np.nanmax(values, axis=0) - mins
+        min_dict = dict(zip(feature_cols, mins))
+        range_dict = dict(zip(feature_cols, ranges))
+
+    # Standardize the features in the dataframe with one block-level operation
+    scale_cols = [column for column in df.columns if column != 'Subtype' and column in min_dict]
+    min_series = pd.Series(min_dict)
+    range_series = pd.Series(range_dict)
+    df[scale_cols] = df[scale_cols].sub(min_series[scale_cols]).div(range_series[scale_cols])
 
     return df, min_dict, range_dict
 
 
+_MSV_STATS = None
+
+def _msv_class_stats(class_mats):
+    """
+    Precompute the per-class feature means (n_classes, n_features) and the stacked
+    per-class covariance (centered Gram) matrices (n_classes, n_features, n_features)
+    that the objective needs, so candidate evaluations never touch the raw samples.
+    """
+    feat_means = np.stack([mat.mean(axis=0) for mat in class_mats])
+    gram_mats = []
+    for mat, means in zip(class_mats, feat_means):
+        centered = mat - means
+        gram_mats.append(centered.T @ centered / mat.shape[0])
+    return feat_means, np.stack(gram_mats)
+
+def _msv_pool_init(feat_means, gram_mats, min_class_size):
+    """
+    Store the precomputed class statistics where _msv_objective can see them.
+    Used both as a Pool worker initializer and directly in the parent process.
+    """
+    global _MSV_STATS
+    _MSV_STATS = (feat_means, gram_mats, min_class_size)
+
+def _simplex_volume(vectors):
+    """
+    Calculate the volume of the simplex spanned by n+1 vertices using the determinant
+    formula V = |det(E)| / n!, where E holds the edge vectors from the first vertex.
+    The determinant magnitude is taken from a QR factorization, which stays stable for
+    near-degenerate simplices and handles vertices embedded in higher dimensions.
+    Parameters:
+        vectors (np.array): An (n+1, d) array of vertices, with d >= n.
+    Returns:
+        volume (float): The volume of the simplex.
+    """
+    edges = np.asarray(vectors[1:], dtype=float) - vectors[0]
+    _, r = np.linalg.qr(edges.T)
+    return np.abs(np.prod(np.diag(r))) / math.factorial(len(edges))
+
+@njit(cache=True, fastmath=True)
+def _msv_objective_core(masked_vectors, masked_cov_mats):
+    """
+    Numeric core of the MSV objective: for each vertex, take the product of the
+    variances of the class data projected onto its edges, and sum those products
+    into the total scale factor. Written with explicit loops so numba (when
+    installed) compiles it into a single fused pass over the small arrays.
+    Parameters:
+        masked_vectors (np.array): (n_classes, n_mask) class mean vectors.
+        masked_cov_mats (np.array): (n_classes, n_mask, n_mask) class covariances.
+    Returns:
+        scale_factor (float): The total edge-related variance volume.
+    """
+    n_classes = masked_vectors.shape[0]
+    scale_factor = 0.0
+    for i in range(n_classes):
+        vertex_volume = 1.0
+        for j in range(n_classes):
+            if j == i:
+                continue
+            edge = masked_vectors[j] - masked_vectors[i]
+            edge = edge / np.sqrt(np.dot(edge, edge))
+            # Mean over classes of the variance of the data projected onto this edge direction
+            edge_variance = 0.0
+            for k in range(n_classes):
+                edge_variance += np.dot(edge, np.dot(masked_cov_mats[k], edge))
+            vertex_volume *= edge_variance / n_classes
+        scale_factor += vertex_volume
+    return scale_factor
+
+def _msv_objective(feature_mask):
+    """
+    Objective function to be maximized, evaluated against the class statistics
+    registered via _msv_pool_init (module-level so it pickles for Pool workers).
+    Parameters:
+        feature_mask (np.array): A binary array indicating which features to include.
+    Returns:
+        volume (float): The volume of the simplex formed by the class mean vectors.
+    """
+    feat_means, gram_mats, min_class_size = _MSV_STATS
+    idx = np.flatnonzero(feature_mask)
+    # With more features than the smallest class has free degrees, every class
+    # covariance is singular by construction - no need to test them
+    if len(idx) > min_class_size - 1:
+        return 10e-10
+    # Gather the cached statistics for the masked features
+    masked_vectors = feat_means[:, idx]
+    masked_cov_mats = gram_mats[:, idx[:, None], idx[None, :]]
+    psd_stati = [is_positive_semi_definite(masked_cov_mat) for masked_cov_mat in masked_cov_mats]
+    if not all(psd_stati):
+        return 10e-10
+
+    # Calculate the total edge-related standard deviation volume at the vertices
+    scale_factor = _msv_objective_core(masked_vectors, masked_cov_mats)
+
+    # Calculate the volume of the simplex, weighted by features used (minimize feature space)
+    volume = _simplex_volume(masked_vectors) / scale_factor
+    # Calculate the pairwise distances between the mean vectors directly (the set is
+    # tiny, so broadcasting beats going through scipy's pdist machinery)
+    diffs = masked_vectors[:, None, :] - masked_vectors[None, :, :]
+    sq_dists = np.einsum('ijk,ijk->ij', diffs, diffs)
+    pairwise_distances = np.sqrt(sq_dists[np.triu_indices(masked_vectors.shape[0], 1)])
+    # Penalize the volume by the irregularity of the simplex (no penalty for a regular simplex)
+    penalty = np.max(pairwise_distances) / np.min(pairwise_distances)
+    return volume / penalty
+
+
 def maximal_simplex_volume(df: pd.DataFrame) -> pd.DataFrame:
     """
     Given a reference data frame containing features and values for select anchoring subtypes, return
@@ -127,83 +273,31 @@ def maximal_simplex_volume(df: pd.DataFrame) -> pd.DataFrame:
     n_classes = len(df.Subtype.unique())
     n_features = len(df.columns) - 1
     subtypes = df.Subtype.unique()
-    class_mats = [df.loc[df['Subtype'] == subtype].drop('Subtype', axis=1).to_numpy() for subtype in subtypes]
+    # Column-major layout so per-feature column reductions stream over contiguous memory
+    class_mats = [np.asfortranarray(df.loc[df['Subtype'] == subtype].drop('Subtype', axis=1).to_numpy())
+                  for subtype in subtypes]
+    feat_means, gram_mats = _msv_class_stats(class_mats)
+    min_class_size = min(mat.shape[0] for mat in class_mats)
+    # Per-feature column standard deviations, shared by the separation proxy and reporting
+    feat_stds = np.sqrt(np.diagonal(gram_mats, axis1=1, axis2=2))
+    # Cheap per-feature class-separation proxy (best pairwise mean gap over pooled spread),
+    # used to prune unpromising candidates before paying for the full objective
+    mean_gaps = np.abs(feat_means[:, None, :] - feat_means[None, :, :])
+    pooled_stds = feat_stds[:, None, :] + feat_stds[None, :, :] + 1e-12
+    feature_scores = (mean_gaps / pooled_stds).max(axis=(0, 1))
     df = df.drop('Subtype', axis=1)
     print('Running anchor maximal simplex volume feature subsetting . . .')
     print("Total classes (simplex order + 1): " + str(n_classes))
     print("Total features (feature space order): " + str(n_features))
-    
-    def simplex_volume_recursive(vectors):
-        """
-        Calculate the volume of a simplex in n-dimensional space using recursion and the formula for a simplex volume based on its base and height.
-        Parameters:
-            vectors (list of np.array): A list of n+1 vectors, each describing a point in n-dimensional space.
-        Returns:
-            volume (float): The volume of the simplex.
-        """
-        n = len(vectors)
-        if n == 1:
-            return vectors[0][0]  # The volume of a 1D simplex (line segment) is its length
-        else:
-            # Calculate the base of the simplex (the volume of the (n-1)-dimensional simplex formed by the first n-1 vectors)
-            base = simplex_volume_recursive(vectors[:-1])
-            # Calculate the height of the simplex (the distance from the nth vector to the (n-1)-dimensional simplex formed by the first n-1 vectors)
-            height = np.linalg.norm(vectors[-1] - vectors[0])
-            # Calculate the volume of the simplex
-            volume = base * height / n
-            return volume
-
-    def objective(feature_mask):
-        """
-        Objective function to be maximized.
-        Parameters:
-            feature_mask (np.array): A binary array indicating which features to include.
-            vectors (list of np.array): A list of vectors.
-        Returns:
-            volume (float): The volume of the simplex formed by the vectors.
-        """
-        # Apply the feature mask to the vectors
-        masked_mats = [mat[:, feature_mask.astype(bool)] for mat in class_mats]
-        masked_vectors = [np.mean(masked_mat, axis=0) for masked_mat in masked_mats]
-        masked_cov_mats = [np.cov(masked_mat, rowvar=False) for masked_mat in masked_mats]
-        psd_stati = [is_positive_semi_definite(masked_cov_mat) for masked_cov_mat in masked_cov_mats]
-        if not all(psd_stati):
-            return 10e-10
-        # n_mask = sum(feature_mask)
-        # masked_dets = [np.linalg.det(cov_matrix) for cov_matrix in masked_cov_mats]
-        # masked_nstdevs = [det**(1 / n_mask) if det >= 0 else 1000 for det in masked_dets]  # 1000 is an arbitrary large value
-        # scale_factor = np.sum(masked_nstdevs)
-
-        # Calculate the edges of the simplex
-        edges = [v - masked_vectors[i] for i, v in enumerate(masked_vectors) for _ in range(i)]
-        # Project the data onto the edges and calculate the variance of the projected data
-        edge_variances = []
-        for edge in edges:
-            projections = [np.dot(masked_mat - np.mean(masked_mat, axis=0), edge) for masked_mat in masked_mats]
-            variances = [np.var(projection) for projection in projections]
-            edge_variances.append(np.mean(variances))
-        # Calculate the "volume" of the standard deviations at each vertex
-        vertex_stdev_volumes = []
-        for i in range(len(masked_vectors)):
-            vertex_edge_variances = edge_variances[i*(len(masked_vectors)-1):(i+1)*(len(masked_vectors)-1)]
-            vertex_stdev_volumes.append(np.prod(vertex_edge_variances))
-        # Calculate the total edge-related standard deviation volume
-        scale_factor = np.sum(vertex_stdev_volumes)
-
-        # Calculate the volume of the simplex, weighted by features used (minimize feature space)
-        volume = simplex_volume_recursive(masked_vectors) / scale_factor
-        # Calculate the pairwise distances between the mean vectors
-        pairwise_distances = pdist(masked_vectors)
-        # Penalize the volume by the irregularity of the simplex (no penalty for a regular simplex)
-        penalty = np.max(pairwise_distances) / np.min(pairwise_distances)
-        return volume / penalty
-
-    def greedy_maximize(fun, n, n_min):
+
+    def greedy_maximize(fun, n, n_min, n_candidates=8):
         """
         Greedy algorithm to maximize a function.
         Parameters:
             fun (function): The function to be maximized. It takes a binary mask as input.
             n (int): The length of the binary mask.
+            n_min (int): The number of bits set in the exhaustively-evaluated initial masks.
+            n_candidates (int): How many proxy-ranked features to score fully per sweep.
         Returns:
             best_mask (np.array): The binary mask that maximizes the function.
         """
@@ -212,64 +306,79 @@ def maximal_simplex_volume(df: pd.DataFrame) -> pd.DataFrame:
         best_value = -np.inf
         printed_features = set()
 
-        # Evaluate all possible masks with n_min bits set to 1
-        print('Evaluating all possible masks with ' + str(n_min) + ' bits set to 1 . . .')
-        for indices in itertools.combinations(range(n), n_min):
+        def mask_for(indices):
             mask = np.zeros(n, dtype=bool)
             mask[list(indices)] = 1
-            value = fun(mask)
-            if value > best_value:
-                best_mask = mask
-                best_value = value
-        print('Complete. Initial mask features:\n')
-
-        for feature in df.columns[best_mask.astype(bool)]:
-            print('-------   ' + feature)
-            feature_index = df.columns.get_loc(feature)
-            for subtype, mc_df in zip(subtypes, class_mats):
-                print(subtype + ': Mean = ' + str(np.mean(mc_df[:, feature_index])) + ', Std Dev = ' + str(np.std(mc_df[:, feature_index])))
-            printed_features.add(feature)
-
-        # Use a greedy algorithm to maximize the function
-        print('\nRunning greedy maximization . . . (added features:)\n')
-        while True:
-            # Initialize the best new mask and best new value
-            best_new_mask = best_mask
-            best_new_value = best_value
-            # Iterate over all bits in the mask
-            for i in range(n):
-                if not best_mask[i]:
-                    # Try flipping the bit
+            return mask
+
+        # Candidate evaluations are independent, so fan them out over one worker pool
+        with Pool(initializer=_msv_pool_init, initargs=(feat_means, gram_mats, min_class_size)) as pool:
+            # Evaluate all possible masks with n_min bits set to 1
+            print('Evaluating all possible masks with ' + str(n_min) + ' bits set to 1 . . .')
+            values = pool.imap(fun, (mask_for(indices) for indices in itertools.combinations(range(n), n_min)),
+                               chunksize=256)
+            for indices, value in zip(itertools.combinations(range(n), n_min), values):
+                if value > best_value:
+                    best_mask = mask_for(indices)
+                    best_value = value
+            print('Complete. Initial mask features:\n')
+
+            for feature in df.columns[best_mask.astype(bool)]:
+                print('-------   ' + feature)
+                feature_index = df.columns.get_loc(feature)
+                for k, subtype in enumerate(subtypes):
+                    print(subtype + ': Mean = ' + str(feat_means[k, feature_index]) + ', Std Dev = ' + str(feat_stds[k, feature_index]))
+                printed_features.add(feature)
+
+            # Use a greedy algorithm to maximize the function
+            print('\nRunning greedy maximization . . . (added features:)\n')
+            while True:
+                # Rank the unset bits by the separation proxy and only pay for the full
+                # objective on the most promising candidates, scored in parallel
+                off_bits = np.flatnonzero(~best_mask)
+                if len(off_bits) > n_candidates:
+                    off_bits = off_bits[np.argsort(feature_scores[off_bits])[::-1][:n_candidates]]
+                candidates = []
+                for i in off_bits:
                     new_mask = best_mask.copy()
                     new_mask[i] = 1
-                    new_value = fun(new_mask)
-                    # Update the best new mask and best new value
-                    if new_value > best_new_value:
-                        best_new_mask = new_mask
-                        best_new_value = new_value
-
-            # If no single bit can increase the function value, stop the algorithm
-            if best_new_value == best_value:
-                break
-            # Otherwise, update the best mask and best value
-            best_mask = best_new_mask
-            best_value = best_new_value
-            for feature in df.columns[best_mask.astype(bool)]:
-                if feature not in printed_features:
-                    print('-------   ' + feature)
-                    feature_index = df.columns.get_loc(feature)
-                    for subtype, mc_df in zip(subtypes, class_mats):
-                        print(subtype + ': Mean = ' + str(np.mean(mc_df[:, feature_index])) + ', Std Dev = ' + str(np.std(mc_df[:, feature_index])))
-                    printed_features.add(feature)
+                    candidates.append(new_mask)
+                new_values = pool.map(fun, candidates)
+
+                # If no single bit can increase the function value, stop the algorithm
+                if not new_values or max(new_values) <= best_value:
+                    break
+                # Otherwise, update the best mask and best value
+                best_idx = int(np.argmax(new_values))
+                best_mask = candidates[best_idx]
+                best_value = new_values[best_idx]
+                for feature in df.columns[best_mask.astype(bool)]:
+                    if feature not in printed_features:
+                        print('-------   ' + feature)
+                        feature_index = df.columns.get_loc(feature)
+                        for k, subtype in enumerate(subtypes):
+                            print(subtype + ': Mean = ' + str(feat_means[k, feature_index]) + ', Std Dev = ' + str(feat_stds[k, feature_index]))
+                        printed_features.add(feature)
         return best_mask
 
-    result = greedy_maximize(lambda x: objective(x), n_features, n_classes - 1)
+    _msv_pool_init(feat_means, gram_mats, min_class_size)  # register the statistics for in-process objective calls
+    result = greedy_maximize(_msv_objective, n_features, n_classes - 1)
     print('\nMaximal simplex volume feature subset complete.')
-    print('Final (weighted) simplex volume: ' + str(objective(result)))
+    print('Final (weighted) simplex volume: ' + str(_msv_objective(result)))
     print('Final number of features: ' + str(sum(result)))
     return df[df.columns[result.astype(bool)]]
 
 
+def _shapiro_pvalue(values):
+    """
+    Shapiro-Wilk p-value for one feature/phenotype group; groups too small to test
+    are treated as normal (p = 1.0).
+    """
+    if len(values) < 3:
+        return 1.0
+    return shapiro(values).pvalue
+
+
 def norm_exp(df: pd.DataFrame, direct: str, thresh: float = 0.05):
     """
     Calculate the Shapiro p-values (likelihood data does NOT belong to a normal distribution) for each subtype in each
@@ -292,18 +401,21 @@ def norm_exp(df: pd.DataFrame, direct: str, thresh: float = 0.05):
     # Create a dataframe for each phenotype
     pheno_dfs = [df[df['Subtype'] == phenotype].drop('Subtype', axis=1) for phenotype in phenotypes]
 
-    # Initialize the dataframe for the p-values
-    df_lpq = pd.DataFrame(index=pheno_dfs[0].columns, columns=[f'{phenotype}_p-value' for phenotype in phenotypes])
-
-    # Calculate the Shapiro p-values for each phenotype and feature
-    for roi in pheno_dfs[0].columns:
-        for pheno_index, pheno_df in enumerate(pheno_dfs):
-            if len(pheno_df[roi]) < 3:
+    # Flatten the (feature x phenotype) groups into one task list of plain arrays
+    rois = pheno_dfs[0].columns
+    tasks = []
+    for roi in rois:
+        for pheno_df in pheno_dfs:
+            values = pheno_df[roi].to_numpy()
+            if len(values) < 3:
                 print(f"Skipping Shapiro-Wilk test for {roi} as it has less than 3 data points.")
-                df_lpq.loc[roi, f'{phenotypes[pheno_index]}_p-value'] = 1.0
-            else:
-                shapiro_test = shapiro(pheno_df[roi])
-                df_lpq.loc[roi, f'{phenotypes[pheno_index]}_p-value'] = shapiro_test.pvalue
+            tasks.append(values)
+
+    # Calculate the Shapiro p-values for each phenotype and feature in parallel
+    with Pool() as pool:
+        pvals = pool.map(_shapiro_pvalue, tasks, chunksize=64)
+    pval_mat = np.fromiter(pvals, dtype=float, count=len(tasks)).reshape(len(rois), len(pheno_dfs))
+    df_lpq = pd.DataFrame(pval_mat, index=rois, columns=[f'{phenotype}_p-value' for phenotype in phenotypes])
 
     # Filter the features based on the threshold
     df_lpq = df_lpq[(df_lpq > thresh).all(axis=1)]
@@ -362,16 +474,22 @@ def nroc_curve(y_true: np.array, predicted: np.array, num_thresh: int = 1000) ->
     """
     step = 1 / num_thresh
     thresholds = np.arange(0, 1 + step, step)
-    fprs, tprs = [], []
-
-    for threshold in thresholds:
-        y_pred = np.where(predicted >= threshold, 1, 0)
-        fp = np.sum((y_pred == 1) & (y_true == 0))
-        tp = np.sum((y_pred == 1) & (y_true == 1))
-        fn = np.sum((y_pred == 0) & (y_true == 1))
-        tn = np.sum((y_pred == 0) & (y_true == 0))
-        fprs.append(fp / (fp + tn))
-        tprs.append(tp / (tp + fn))
-
+    y_true = np.asarray(y_true)
+    predicted = np.asarray(predicted)
+
+    # Sort once by descending score so the positives at each threshold form a prefix
+    order = np.argsort(-predicted, kind='stable')
+    y_sorted = y_true[order]
+    tp_cum = np.concatenate(([0], np.cumsum(y_sorted)))
+    n_pos = tp_cum[-1]
+    n_neg = y_sorted.size - n_pos
+
+    # Number of predictions >= each threshold, found by binary search on the sorted scores
+    cuts = np.searchsorted(-predicted[order], -thresholds, side='right')
+    tps = tp_cum[cuts]
+    fps = cuts - tps
+
+    fprs = (fps / n_neg).tolist()
+    tprs = (tps / n_pos).tolist()
     return fprs, tprs, thresholds
 